@@ -1,18 +1,53 @@
-from sqlalchemy.ext.asyncio import async_sessionmaker, create_async_engine
+from asyncio import current_task
+import os
+
+from sqlalchemy import event
+from sqlalchemy.ext.asyncio import (
+    async_scoped_session, async_sessionmaker, create_async_engine
+)
 from sqlalchemy.orm import DeclarativeBase
 
 
 DATABASE_URL = 'sqlite+aiosqlite:///./essences.db'
+SQL_ECHO = os.getenv('SQL_ECHO') == '1'
+SQLITE_PRAGMAS = (
+    'PRAGMA journal_mode=WAL',
+    'PRAGMA synchronous=NORMAL',
+    'PRAGMA temp_store=MEMORY',
+    'PRAGMA cache_size=-65536',
+    'PRAGMA mmap_size=268435456',
+    'PRAGMA foreign_keys=ON',
+)
 
 
 engine = create_async_engine(
     DATABASE_URL,
-    echo=True,
+    echo=SQL_ECHO,
+    pool_size=10,
+    max_overflow=20,
+    pool_recycle=3600,
+    connect_args={'timeout': 30},
 )
 
+
+@event.listens_for(engine.sync_engine, 'connect')
+def set_sqlite_pragmas(dbapi_connection, connection_record):
+    """Настраивает каждое новое соединение с SQLite."""
+    cursor = dbapi_connection.cursor()
+    for pragma in SQLITE_PRAGMAS:
+        cursor.execute(pragma)
+    cursor.close()
+
+
 AsyncSessionLocal = async_sessionmaker(
     engine,
     expire_on_commit=False,
+    autoflush=False,
+)
+
+AsyncScopedSession = async_scoped_session(
+    AsyncSessionLocal,
+    scopefunc=current_task,
 )
 
 
@@ -0,0 +1,8 @@
+import os
+
+
+bind = os.getenv('BIND', '0.0.0.0:80')
+workers = max(2, os.cpu_count() or 1)
+worker_class = 'uvicorn_worker.UvicornWorker'
+loglevel = 'warning'
+accesslog = None
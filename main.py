@@ -1,9 +1,12 @@
 from contextlib import asynccontextmanager
 
 from fastapi import FastAPI
+from fastapi.responses import ORJSONResponse
+from sqlalchemy import inspect
 import uvicorn
 
 from database import Base, engine
+from models import ESSENCE_FTS_DDL, essence_fts
 from routers import router
 
 
@@ -12,10 +15,23 @@ DESC_APP = 'CRUD API на FastAPI + SQLAlchemy'
 APP_VERSION = '1.0'
 
 
+def create_schema(connection):
+    """Создаёт недостающие таблицы и индексы."""
+    Base.metadata.create_all(connection)
+    for table in Base.metadata.sorted_tables:
+        for index in table.indexes:
+            index.create(connection, checkfirst=True)
+    if not inspect(connection).has_table(essence_fts.name):
+        for statement in ESSENCE_FTS_DDL:
+            connection.exec_driver_sql(statement)
+
+
 @asynccontextmanager
 async def lifespan(app: FastAPI):
     async with engine.begin() as conn:
-        await conn.run_sync(Base.metadata.create_all)
+        # Воркеры gunicorn стартуют одновременно: схему создаёт один из них.
+        await conn.exec_driver_sql('BEGIN IMMEDIATE')
+        await conn.run_sync(create_schema)
     yield
 
 
@@ -24,9 +40,15 @@ app = FastAPI(
     description=DESC_APP,
     version=APP_VERSION,
     lifespan=lifespan,
+    default_response_class=ORJSONResponse,
 )
 app.include_router(router)
 
 
 if __name__ == '__main__':
-    uvicorn.run('main:app', reload=True)
+    uvicorn.run(
+        'main:app',
+        reload=False,
+        log_level='warning',
+        access_log=False,
+    )
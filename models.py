@@ -1,4 +1,4 @@
-from sqlalchemy import Boolean, Integer, String
+from sqlalchemy import Boolean, Index, Integer, String, column, table
 from sqlalchemy.orm import Mapped, mapped_column
 
 from database import Base
@@ -6,9 +6,33 @@ from database import Base
 
 class Essence(Base):
     __tablename__ = 'essence'
+    __table_args__ = (
+        Index('ix_essence_filters', 'is_done', 'quantity'),
+    )
     id: Mapped[int] = mapped_column(primary_key=True)
     name: Mapped[str] = mapped_column(String(255))
-    quantity: Mapped[int] = mapped_column(Integer)
+    quantity: Mapped[int] = mapped_column(Integer, index=True)
     is_done: Mapped[bool] = mapped_column(
         Boolean, default=False, nullable=False
     )
+
+
+essence_fts = table('essence_fts', column('rowid'), column('name'))
+
+ESSENCE_FTS_DDL = (
+    "CREATE VIRTUAL TABLE essence_fts USING fts5("
+    "name, content='essence', content_rowid='id', tokenize='trigram')",
+    "INSERT INTO essence_fts(essence_fts) VALUES ('rebuild')",
+    "CREATE TRIGGER essence_fts_ai AFTER INSERT ON essence BEGIN "
+    "INSERT INTO essence_fts(rowid, name) VALUES (new.id, new.name); "
+    "END",
+    "CREATE TRIGGER essence_fts_ad AFTER DELETE ON essence BEGIN "
+    "INSERT INTO essence_fts(essence_fts, rowid, name) "
+    "VALUES ('delete', old.id, old.name); "
+    "END",
+    "CREATE TRIGGER essence_fts_au AFTER UPDATE OF name ON essence BEGIN "
+    "INSERT INTO essence_fts(essence_fts, rowid, name) "
+    "VALUES ('delete', old.id, old.name); "
+    "INSERT INTO essence_fts(rowid, name) VALUES (new.id, new.name); "
+    "END",
+)
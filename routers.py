@@ -1,16 +1,27 @@
+import hashlib
+from operator import attrgetter
 from typing import Annotated, List, Optional
 
-from fastapi import APIRouter, Depends, HTTPException, Query, status
-from fastapi.responses import Response
-from sqlalchemy import select
+from fastapi import APIRouter, Depends, HTTPException, Query, Request, status
+from fastapi.exceptions import RequestValidationError
+from fastapi.responses import Response, StreamingResponse
+from pydantic import ValidationError
+from sqlalchemy import (
+    bindparam, delete, insert, lambda_stmt, select, update
+)
 from sqlalchemy.ext.asyncio import AsyncSession
 
-from database import AsyncSessionLocal
-from models import Essence
-from schemas import EssenceCreate, EssenceOut, EssenceReplace, EssenceUpdate
+from database import AsyncScopedSession
+from models import Essence, essence_fts
+from schemas import (
+    ESSENCE_CREATE_LIST, ESSENCE_OUT_LIST, EssenceCreate, EssenceOut,
+    EssenceReplace, EssenceUpdate
+)
 
 
 URL_PREFIX = '/api/essences'
+STREAM_CHUNK_SIZE = 20
+FTS_MIN_PATTERN_LENGTH = 3
 SUMMARY_GET_ESSENCE_LIST = 'Получить список сущностей'
 SUMMARY_CREATE_ESSENCE = 'Создать сущность'
 SUMMARY_PUT_ESSENCE = 'Обновить сущность полностью'
@@ -29,12 +40,59 @@ DESC_BULK_ESSENCE = 'Создаёт несколько сущностей за 
 DESC_PATCH_ESSENCE = 'Позволяет обновлять только указанные поля сущности'
 ERROR_ESSENCE_NOT_FOUND = 'Сущность не найдена'
 RESPONSE_DELETE_ESSENCE = 'ESSENCE DELETED'
+CACHE_CONTROL_ESSENCE = 'no-cache'
+OPENAPI_BULK_ESSENCE = {
+    'requestBody': {
+        'required': True,
+        'content': {
+            'application/json': {
+                'schema': {
+                    'type': 'array',
+                    'items': EssenceCreate.model_json_schema(),
+                },
+            },
+        },
+    },
+}
 
 
 async def get_db() -> AsyncSession:
-    """Асинхронный генератор сессий базы данных."""
-    async with AsyncSessionLocal() as session:
-        yield session
+    """Асинхронный генератор сессий базы данных в рамках задачи запроса."""
+    try:
+        yield AsyncScopedSession()
+    finally:
+        await AsyncScopedSession.remove()
+
+
+async def get_essence_or_404(essence_id: int, db: AsyncSession) -> Essence:
+    """Возвращает сущность по идентификатору или выбрасывает 404."""
+    result = await db.execute(
+        select(Essence).where(Essence.id == essence_id)
+    )
+    essence = result.scalar_one_or_none()
+    if not essence:
+        raise HTTPException(
+            status_code=status.HTTP_404_NOT_FOUND,
+            detail=ERROR_ESSENCE_NOT_FOUND
+        )
+    return essence
+
+
+def essence_etag(essence: Essence) -> str:
+    """Вычисляет ETag по содержимому сущности."""
+    fingerprint = (
+        f'{essence.id}:{essence.name}:{essence.quantity}:{essence.is_done}'
+    )
+    digest = hashlib.blake2b(fingerprint.encode(), digest_size=8)
+    return f'"{digest.hexdigest()}"'
+
+
+def etag_matches(etag: str, if_none_match: str) -> bool:
+    """Слабое сравнение ETag с заголовком If-None-Match (RFC 9110)."""
+    tags = {
+        tag.strip().removeprefix('W/') for tag in if_none_match.split(',')
+    }
+    return '*' in tags or etag.removeprefix('W/') in tags
 
 
 router = APIRouter(
@@ -84,17 +142,48 @@ async def list_essences(
         description=DESC_PAGINATION_LIST,
     ),
 ):
-    query = select(Essence)
+    params = {'limit': limit, 'offset': offset}
+    query = lambda_stmt(lambda: select(*Essence.__table__.columns))
     if name:
-        query = query.where(Essence.name.ilike(f'%{name}%'))
+        params['pattern'] = f'%{name}%'
+    if name and len(name) >= FTS_MIN_PATTERN_LENGTH:
+        query += lambda s: s.where(Essence.id.in_(
+            select(essence_fts.c.rowid).where(
+                essence_fts.c.name.like(bindparam('pattern')))
+        ))
+    elif name:
+        # Триграммный индекс не находит строки короче трёх символов.
+        query += lambda s: s.where(
+            Essence.name.ilike(bindparam('pattern')))
     if is_done is not None:
-        query = query.where(Essence.is_done == is_done)
+        params['is_done'] = is_done
+        query += lambda s: s.where(Essence.is_done == bindparam('is_done'))
     if min_quantity is not None:
-        query = query.where(Essence.quantity >= min_quantity)
+        params['min_quantity'] = min_quantity
+        query += lambda s: s.where(
+            Essence.quantity >= bindparam('min_quantity'))
     if max_quantity is not None:
-        query = query.where(Essence.quantity <= max_quantity)
-    result = await db.execute(query.limit(limit).offset(offset))
-    return result.scalars().all()
+        params['max_quantity'] = max_quantity
+        query += lambda s: s.where(
+            Essence.quantity <= bindparam('max_quantity'))
+    query += lambda s: s.limit(bindparam('limit')).offset(
+        bindparam('offset'))
+
+    async def stream_essences():
+        result = await db.stream(query, params)
+        yield b'['
+        separator = b''
+        async for rows in result.mappings().partitions(STREAM_CHUNK_SIZE):
+            essences = ESSENCE_OUT_LIST.validate_python(rows)
+            # Срезаем скобки массива, чтобы склеить части в один JSON.
+            yield separator + ESSENCE_OUT_LIST.dump_json(essences)[1:-1]
+            separator = b','
+        yield b']'
+
+    return StreamingResponse(
+        stream_essences(),
+        media_type='application/json',
+    )
 
 
 @router.get(
@@ -102,13 +191,21 @@ async def list_essences(
     response_model=EssenceOut,
     summary=SUMMARY_ONE_ESSENCE,
 )
-async def get_essence(essence_id: int, db: AsyncSession = Depends(get_db)):
-    essence = await db.get(Essence, essence_id)
-    if not essence:
-        raise HTTPException(
-            status_code=status.HTTP_404_NOT_FOUND,
-            detail=ERROR_ESSENCE_NOT_FOUND
+async def get_essence(
+    essence_id: int,
+    request: Request,
+    response: Response,
+    db: AsyncSession = Depends(get_db),
+):
+    essence = await get_essence_or_404(essence_id, db)
+    etag = essence_etag(essence)
+    headers = {'ETag': etag, 'Cache-Control': CACHE_CONTROL_ESSENCE}
+    if etag_matches(etag, request.headers.get('If-None-Match', '')):
+        return Response(
+            status_code=status.HTTP_304_NOT_MODIFIED,
+            headers=headers,
         )
+    response.headers.update(headers)
     return essence
 
 
@@ -118,16 +215,27 @@ async def get_essence(essence_id: int, db: AsyncSession = Depends(get_db)):
     status_code=status.HTTP_201_CREATED,
     summary=SUMMARY_BULK_ESSENCE,
     description=DESC_BULK_ESSENCE,
+    openapi_extra=OPENAPI_BULK_ESSENCE,
 )
 async def create_essences_bulk(
-    essences_in: List[EssenceCreate],
+    request: Request,
     db: AsyncSession = Depends(get_db),
 ):
-    essences = [Essence(**item.model_dump()) for item in essences_in]
-    db.add_all(essences)
+    try:
+        essences_in = ESSENCE_CREATE_LIST.validate_json(await request.body())
+    except ValidationError as error:
+        raise RequestValidationError([
+            {**detail, 'loc': ('body', *detail['loc'])}
+            for detail in error.errors(include_url=False)
+        ])
+    if not essences_in:
+        return []
+    result = await db.execute(
+        insert(Essence).returning(Essence),
+        [item.model_dump() for item in essences_in],
+    )
+    essences = sorted(result.scalars(), key=attrgetter('id'))
     await db.commit()
-    for essence in essences:
-        await db.refresh(essence)
     return essences
 
 
@@ -141,10 +249,13 @@ async def create_essence(
     essence_in: Annotated[EssenceCreate, Depends()],
     db: AsyncSession = Depends(get_db),
 ):
-    essence = Essence(**essence_in.model_dump())
-    db.add(essence)
+    result = await db.execute(
+        insert(Essence)
+        .values(**essence_in.model_dump())
+        .returning(Essence)
+    )
+    essence = result.scalar_one()
     await db.commit()
-    await db.refresh(essence)
     return essence
 
 
@@ -158,16 +269,20 @@ async def put_essence(
     essence_in: EssenceReplace,
     db: AsyncSession = Depends(get_db),
 ):
-    essence = await db.get(Essence, essence_id)
+    result = await db.execute(
+        update(Essence)
+        .where(Essence.id == essence_id)
+        .values(**essence_in.model_dump())
+        .returning(Essence)
+        .execution_options(synchronize_session=False)
+    )
+    essence = result.scalar_one_or_none()
     if not essence:
         raise HTTPException(
             status_code=status.HTTP_404_NOT_FOUND,
             detail=ERROR_ESSENCE_NOT_FOUND
         )
-    for key, value in essence_in.model_dump().items():
-        setattr(essence, key, value)
     await db.commit()
-    await db.refresh(essence)
     return essence
 
 
@@ -182,16 +297,23 @@ async def patch_essence(
     essence_in: EssenceUpdate,
     db: AsyncSession = Depends(get_db),
 ):
-    essence = await db.get(Essence, essence_id)
+    values = essence_in.model_dump(exclude_unset=True)
+    if not values:
+        return await get_essence_or_404(essence_id, db)
+    result = await db.execute(
+        update(Essence)
+        .where(Essence.id == essence_id)
+        .values(**values)
+        .returning(Essence)
+        .execution_options(synchronize_session=False)
+    )
+    essence = result.scalar_one_or_none()
     if not essence:
         raise HTTPException(
             status_code=status.HTTP_404_NOT_FOUND,
             detail=ERROR_ESSENCE_NOT_FOUND
         )
-    for key, value in essence_in.model_dump(exclude_unset=True).items():
-        setattr(essence, key, value)
     await db.commit()
-    await db.refresh(essence)
     return essence
 
 
@@ -204,12 +326,16 @@ async def delete_essence(
     essence_id: int,
     db: AsyncSession = Depends(get_db),
 ):
-    essence = await db.get(Essence, essence_id)
-    if not essence:
+    result = await db.execute(
+        delete(Essence)
+        .where(Essence.id == essence_id)
+        .returning(Essence.id)
+        .execution_options(synchronize_session=False)
+    )
+    if result.scalar_one_or_none() is None:
         raise HTTPException(
             status_code=status.HTTP_404_NOT_FOUND,
             detail=ERROR_ESSENCE_NOT_FOUND
         )
-    await db.delete(essence)
     await db.commit()
     return Response(status_code=status.HTTP_204_NO_CONTENT)
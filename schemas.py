@@ -1,6 +1,6 @@
-from typing import Optional
+from typing import List, Optional
 
-from pydantic import BaseModel, ConfigDict, Field
+from pydantic import BaseModel, ConfigDict, Field, TypeAdapter
 
 
 class EssenceBase(BaseModel):
@@ -36,4 +36,8 @@ class EssenceOut(EssenceBase):
 
     id: int
 
-    model_config = ConfigDict(from_attributes=True)
+    model_config = ConfigDict(from_attributes=True, frozen=True)
+
+
+ESSENCE_CREATE_LIST = TypeAdapter(List[EssenceCreate])
+ESSENCE_OUT_LIST = TypeAdapter(List[EssenceOut])